@@ -8,6 +8,7 @@ from . import module as _module
 from . import naming as _naming
 from . import tensor as _tensor
 from . import namespace as _namespace
+from .. import log
 
 
 class CallEntry:
@@ -15,28 +16,49 @@ class CallEntry:
   Can be a module() call, or regular func.
   Note that a module can be called multiple times.
   """
+  # There are many instances (one per module call), thus use slots.
+  __slots__ = (
+    "module",
+    "orig_inputs_args", "orig_inputs_kwargs", "orig_inputs_flat", "orig_outputs", "orig_outputs_flat",
+    "inputs_args", "inputs_kwargs", "inputs_flat", "outputs", "outputs_flat",
+    "parent_call", "child_calls", "level", "namespace", "returnn_layer", "returnn_layer_dict")
   module: _module.ModuleEntry
-  orig_inputs_args: Optional[Tuple[Union[_types.Tensor, Any]]] = None
-  orig_inputs_kwargs: Optional[Dict[str, Tuple[_types.Tensor, Any]]] = None
-  orig_inputs_flat: Optional[List[Tuple[_types.Tensor, Any]]] = None
-  orig_outputs: Optional[Union[_types.Tensor, Tuple[_types.Tensor]]] = None
-  orig_outputs_flat: Optional[List[Union[_types.Tensor, Any]]] = None
-  inputs_args: Optional[Tuple[Optional[_tensor.TensorEntry]]] = None
-  inputs_kwargs: Optional[Dict[str, Optional[Tuple[_tensor.TensorEntry, Any]]]] = None
-  inputs_flat: Optional[List[_tensor.TensorEntry]] = None
-  outputs: Optional[List[_tensor.TensorEntry]] = None
-  outputs_flat: Optional[List[_tensor.TensorEntry]] = None
-  parent_call: Optional[CallEntry] = None  # parent in the call stack
+  orig_inputs_args: Optional[Tuple[Union[_types.Tensor, Any]]]
+  orig_inputs_kwargs: Optional[Dict[str, Tuple[_types.Tensor, Any]]]
+  orig_inputs_flat: Optional[List[Tuple[_types.Tensor, Any]]]
+  orig_outputs: Optional[Union[_types.Tensor, Tuple[_types.Tensor]]]
+  orig_outputs_flat: Optional[List[Union[_types.Tensor, Any]]]
+  inputs_args: Optional[Tuple[Optional[_tensor.TensorEntry]]]
+  inputs_kwargs: Optional[Dict[str, Optional[Tuple[_tensor.TensorEntry, Any]]]]
+  inputs_flat: Optional[List[_tensor.TensorEntry]]
+  outputs: Optional[List[_tensor.TensorEntry]]
+  outputs_flat: Optional[List[_tensor.TensorEntry]]
+  parent_call: Optional[CallEntry]  # parent in the call stack
   child_calls: List[CallEntry]
-  level: Optional[int] = None
-  namespace: Optional[_namespace.RegisteredName] = None
-  returnn_layer: Optional[LayerBase] = None
-  returnn_layer_dict: Optional[Dict[str, Any]] = None
+  level: Optional[int]
+  namespace: Optional[_namespace.RegisteredName]
+  returnn_layer: Optional[LayerBase]
+  returnn_layer_dict: Optional[Dict[str, Any]]
 
   def __init__(self, module: _module.ModuleEntry):
     self.module = module
     module.calls.append(self)
+    self.orig_inputs_args = None
+    self.orig_inputs_kwargs = None
+    self.orig_inputs_flat = None
+    self.orig_outputs = None
+    self.orig_outputs_flat = None
+    self.inputs_args = None
+    self.inputs_kwargs = None
+    self.inputs_flat = None
+    self.outputs = None
+    self.outputs_flat = None
+    self.parent_call = None
     self.child_calls = []
+    self.level = None
+    self.namespace = None
+    self.returnn_layer = None
+    self.returnn_layer_dict = None
 
   def __repr__(self):
     return f"<{self.__class__.__name__} #{self.level} {self.module!r}>"
@@ -57,90 +79,111 @@ class CallEntry:
   def set_returnn_layer(self, layer: Optional[LayerBase], layer_dict: Optional[Dict[str, Any]]):
     self.returnn_layer = layer
     self.returnn_layer_dict = layer_dict
+    _namespace.RegisteredName.invalidate_dump_caches()
 
-  def set_outputs(self, outputs: Union[_types.Tensor, Tuple[_types.Tensor], List[_types.Tensor]]):
+  def set_outputs(self, outputs: Union[_types.Tensor, Tuple[_types.Tensor], List[_types.Tensor]], *,
+                  entry_outputs: Optional[List[_tensor.TensorEntry]] = None):
+    """
+    :param outputs:
+    :param entry_outputs: the corresponding entries of ``outputs``, if already known by the caller
+    """
     assert self.outputs is None
     naming = _naming.Naming.get_instance()
     if naming.keep_orig_module_io_tensors:
       self.orig_outputs = outputs
     if naming.wrap_to_returnn_enabled:  # not all tensors are traced currently otherwise. also not needed
-      if not isinstance(outputs, (list, tuple)):
-        outputs = [outputs]
-      entry_outputs = [naming.tensors[x] for x in outputs]
+      if entry_outputs is None:
+        if not isinstance(outputs, (list, tuple)):
+          outputs = [outputs]
+        entry_outputs = [naming.tensors[x] for x in outputs]
       self.outputs = entry_outputs
+      module = self.module
       for x in entry_outputs:
         x.output_from_calls.append(self)
-        if self.module:
-          x.output_from_modules.append(self.module)
+        if module:
+          x.output_from_modules.append(module)
       if entry_outputs:
-        if self.namespace not in entry_outputs[0].names:
-          entry_outputs[0].names.append(self.namespace)
+        namespace = self.namespace
+        if namespace not in entry_outputs[0].names:
+          entry_outputs[0].names.append(namespace)
+          _namespace.RegisteredName.invalidate_dump_caches()
 
   def apply_call(self) -> _types.Tensor:
     from pytorch_to_returnn.torch.nn import Module
     from pytorch_to_returnn.torch import Tensor
     from returnn.tf.util.basic import reuse_name_scope
     naming = _naming.Naming.get_instance()
+    tensors = naming.tensors
     module = self.module.module
-    assert self.namespace
+    namespace = self.namespace
+    assert namespace
     inputs_flat = [x.tensor() if x else None for x in self.inputs_flat]  # make sure all are tensors
-    inputs_args, inputs_kwargs = nest.pack_sequence_as(
-      structure=(self.inputs_args, self.inputs_kwargs), flat_sequence=inputs_flat)
+    inputs_args, inputs_kwargs = _pack_inputs_as(
+      inputs_args=self.inputs_args, inputs_kwargs=self.inputs_kwargs, inputs_flat=inputs_flat)
 
-    if module.has_torch_forward():
-      for x in inputs_flat:
-        self.namespace.register_input(tensor=naming.tensors[x])
+    # Call it on the class, as Module.__getattribute__ would wrap the bound method.
+    if type(module).has_torch_forward():
+      # self.inputs_flat are already the entries of inputs_flat.
+      namespace.register_inputs([x for x in self.inputs_flat if x is not None])
       res = module.forward(*inputs_args)
       assert isinstance(res, Tensor)  # TODO only single output supported currently...
-      res_entry = naming.tensors[res]
-      if self.namespace.returnn_ctx.sub_net_layer:
-        self.namespace.register_returnn_subnet_output(res_entry)
-      layer = self.namespace.returnn_ctx.sub_net_layer
+      res_entry = tensors[res]
+      sub_net_layer = namespace.returnn_ctx.sub_net_layer
+      if sub_net_layer:
+        namespace.register_returnn_subnet_output(res_entry)
+      layer = sub_net_layer
       layer_dict = None  # will be constructed later lazily when needed
 
     else:  # no module.forward, direct RETURNN layer call
       assert module.create_returnn_layer_dict is not Module.create_returnn_layer_dict
-      assert self.namespace and self.namespace.parent
-      parent_namespace = self.namespace.parent
+      assert namespace.parent
+      parent_namespace = namespace.parent
       parent_namespace.maybe_create_returnn_ctx()
       layer_dict = module.create_returnn_layer_dict(*inputs_args, **inputs_kwargs)
-      layer_name = self.namespace.name
+      layer_name = namespace.name
       returnn_net = parent_namespace.returnn_ctx.network
       assert layer_name not in returnn_net.layers
       if len(self.module.calls) >= 2:
         raise NotImplementedError  # would need to set reuse_params ...
-      print(f"*** {returnn_net.name}/{layer_name!r} layer dict: {layer_dict}")
+      if log.Verbosity >= 3:
+        print(f"*** {returnn_net.name}/{layer_name!r} layer dict: {layer_dict}")
 
       # Now the main construction of the layer itself.
       with reuse_name_scope(parent_namespace.returnn_ctx.tf_name_scope, absolute=True):
         layer = returnn_net.construct_layer(net_dict={layer_name: layer_dict}, name=layer_name)
 
       # Update params in parents.
-      parent_layer = layer.network.parent_layer
+      # This is done eagerly, as every RETURNN SubnetworkLayer is expected to have all the params
+      # of its sub layers in its params dict (making this lazy would need to patch LayerBase).
+      # Every layer is constructed only once (see the check above), so this runs once per layer.
+      layer_params_items = list(layer.params.items())
+      parent_layer = layer.network.parent_layer if layer_params_items else None  # most layers have no params
       parent_layer_param_prefix = f"{layer.name}/"
       while parent_layer:
-        if parent_layer.name.startswith("."):
+        parent_layer_name = parent_layer.name
+        if parent_layer_name.startswith("."):
           break  # stop if hidden
-        parent_layer.params.update({parent_layer_param_prefix + k: v for (k, v) in layer.params.items()})
-        parent_layer_param_prefix = f"{parent_layer.name}/{parent_layer_param_prefix}"
+        parent_layer.params.update({parent_layer_param_prefix + k: v for (k, v) in layer_params_items})
+        parent_layer_param_prefix = f"{parent_layer_name}/{parent_layer_param_prefix}"
         parent_layer = parent_layer.network.parent_layer
 
       module.check_returnn_layer(layer)
       res = module.make_output_tensor_from_returnn(inputs_flat=inputs_flat, layer=layer)
-      res_entry = naming.tensors[res]
+      res_entry = tensors[res]
       assert isinstance(res_entry, _tensor.TensorEntry)
       res_entry.returnn_data = layer.output
-      self.namespace.assign_tensor(res_entry)
+      namespace.assign_tensor(res_entry)
 
     assert isinstance(res, Tensor)
     self.set_returnn_layer(layer=layer, layer_dict=layer_dict)
-    self.set_outputs([res])
+    self.set_outputs([res], entry_outputs=[res_entry])
 
     if layer:  # might not exist in the root namespace
       layer_abs_repr_name = f"{layer.network.name}/{layer.name!r}"
-      print(
-        f"*** {layer_abs_repr_name} {layer.__class__.__name__} output: "
-        f"[{','.join(layer.output.get_batch_axes_short_description())}]")
+      if log.Verbosity >= 3:
+        print(
+          f"*** {layer_abs_repr_name} {layer.__class__.__name__} output: "
+          f"[{','.join(layer.output.get_batch_axes_short_description())}]")
 
       if naming.import_params_from_torch_namespace and layer:
         if not layer_abs_repr_name.startswith("."):  # temp layer
@@ -148,14 +191,16 @@ class CallEntry:
             if list(module.parameters(recurse=False)):
               mod_abs_name = naming.get_module_abs_name(module)
               torch_mod = naming.import_params_from_torch_namespace.get_module_by_abs_name(mod_abs_name)
-              print(
-                f"*** {layer_abs_repr_name} {layer.__class__.__name__} "
-                f"importing params {[name for name, _ in module.named_parameters(recurse=False)]} ...")
+              if log.Verbosity >= 3:
+                print(
+                  f"*** {layer_abs_repr_name} {layer.__class__.__name__} "
+                  f"importing params {[name for name, _ in module.named_parameters(recurse=False)]} ...")
               module.import_params_torch_to_returnn(layer=layer, torch_module=torch_mod)
 
-            print(
-              f"*** {layer_abs_repr_name} {layer.__class__.__name__} "
-              f"check RETURNN inputs/outputs given Torch inputs/outputs ...")
+            if log.Verbosity >= 3:
+              print(
+                f"*** {layer_abs_repr_name} {layer.__class__.__name__} "
+                f"check RETURNN inputs/outputs given Torch inputs/outputs ...")
             module.check_call_returnn_outputs_to_prev_torch(self)
 
     return res
@@ -168,3 +213,22 @@ class CallEntry:
   def __exit__(self, exc_type, exc_val, exc_tb):
     if not exc_type:
       _naming.Naming.get_instance().pop_module_call(self)
+
+
+def _pack_inputs_as(*, inputs_args: Tuple[Any, ...], inputs_kwargs: Dict[str, Any], inputs_flat: List[Any]
+                    ) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+  """
+  Same as ``nest.pack_sequence_as(structure=(inputs_args, inputs_kwargs), flat_sequence=inputs_flat)``.
+  The generic nest logic is quite slow,
+  so we directly handle the common case where all the args and kwargs values are leaves.
+  """
+  def _is_leaf(x: Any) -> bool:
+    return x is None or isinstance(x, _tensor.TensorEntry)
+
+  if not all(_is_leaf(x) for x in inputs_args) or not all(_is_leaf(x) for x in inputs_kwargs.values()):
+    return nest.pack_sequence_as(structure=(inputs_args, inputs_kwargs), flat_sequence=inputs_flat)
+  num_args = len(inputs_args)
+  assert len(inputs_flat) == num_args + len(inputs_kwargs)
+  # nest flattens dicts in sorted key order, but keeps the original key order when packing.
+  kwargs_by_key = {key: inputs_flat[num_args + i] for i, key in enumerate(sorted(inputs_kwargs))}
+  return tuple(inputs_flat[:num_args]), {key: kwargs_by_key[key] for key in inputs_kwargs}
@@ -51,6 +51,9 @@ class ModuleEntry:
     return mod
 
   def get_canonical_name(self, parent_namespace: Optional[_namespace.RegisteredName] = None, *, _visited=None) -> str:
+    # Note: This is not memoized (except via canonical_name, which is set explicitly).
+    # The result depends on parent_owning_modules, parent_context_modules and parent_namespace.modules,
+    # which all still change while the model is being traced.
     if self.canonical_name:
       return self.canonical_name
     if _visited is None:
@@ -63,7 +66,7 @@ class ModuleEntry:
       mod, name = self.parent_owning_modules[0]
       if parent_namespace and mod in parent_namespace.modules:
         prefix = ""
-      elif not mod.module.has_torch_forward() and mod not in _visited:
+      elif mod not in _visited and not type(mod.module).has_torch_forward():
         prefix = mod.get_canonical_name(_visited=_visited)
         if prefix:
           prefix += "_"
@@ -74,7 +77,7 @@ class ModuleEntry:
       return prefix + name
     if parent_namespace and self in parent_namespace.modules:
       return self.module.get_returnn_name()
-    if set(self.parent_context_modules).intersection(_visited):
+    if any(mod in _visited for mod in self.parent_context_modules):
       return self.module.get_returnn_name()
     if parent_namespace and parent_namespace is not naming.root_namespace:
       for mod in self.parent_context_modules:
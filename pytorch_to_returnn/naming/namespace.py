@@ -1,8 +1,8 @@
 
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
-from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
 import itertools
+import sys
 from . import call as _call
 from . import module as _module
 from . import tensor as _tensor
@@ -11,20 +11,28 @@ from . import naming as _naming
 
 
 class RegisteredName:
-  childs_by_name: OrderedDict[str, RegisteredName]
+  # There are many instances (one per layer), thus use slots.
+  __slots__ = (
+    "childs_by_name", "parent", "name", "level", "modules", "calls", "tensor", "returnn_ctx",
+    "wrap_to_returnn_enabled", "is_reserved", "is_subnet",
+    "_inputs", "_absolute_name", "_name_suffix_counter", "_cached_layer_dict", "_cached_net_dict")
+  childs_by_name: Dict[str, RegisteredName]
   parent: Optional[RegisteredName]
   name: Optional[str]  # if parent
-  level: int = 0
+  level: int
   modules: List[_module.ModuleEntry]  # can be multiple merged together
   calls: List[_call.CallEntry]  # can be multiple merged together. can be empty if this is some input
-  tensor: Optional[_tensor.TensorEntry] = None  # output from the call
-  returnn_ctx: Optional[_returnn_ctx.ReturnnContext] = None
+  tensor: Optional[_tensor.TensorEntry]  # output from the call
+  returnn_ctx: Optional[_returnn_ctx.ReturnnContext]
+  wrap_to_returnn_enabled: bool
   is_reserved: bool  # e.g. input "data" or output "output"
   is_subnet: bool
   ReservedInputName = "data"
   ReservedOutputName = "output"
   ReservedNames = {ReservedInputName, ReservedOutputName}
   _inputs: List[RegisteredName]
+  # Increased by any change which might affect the dump_as_returnn_* results. Shared by all instances.
+  _dump_cache_version: int = 0
 
   def __init__(self, *,
                wrap_to_returnn_enabled: Optional[bool] = None,
@@ -32,8 +40,11 @@ class RegisteredName:
                call: Optional[_call.CallEntry] = None,
                tensor: Optional[_tensor.TensorEntry] = None,
                is_reserved: bool = False, is_subnet: bool):
-    self.childs_by_name = OrderedDict()
+    self.childs_by_name = {}
+    self._name_suffix_counter = {}  # type: Dict[str, int]  # suggested name -> next suffix to try
     self._inputs = []
+    self._cached_layer_dict = None  # type: Optional[Tuple[int, Dict[str, Any]]]  # version, layer dict
+    self._cached_net_dict = None  # type: Optional[Tuple[int, Dict[str, Dict[str, Any]]]]  # version, net dict
     self.parent = parent
     if parent:
       assert name
@@ -42,19 +53,22 @@ class RegisteredName:
     else:
       assert not name
       assert wrap_to_returnn_enabled is not None
-    self.name = name
+    # Names are mostly generated and are often the same (e.g. "data", "Linear"), thus intern them.
+    self.name = sys.intern(name) if name else name
+    self._absolute_name = None  # type: Optional[str]  # via get_absolute_name
     self.wrap_to_returnn_enabled = wrap_to_returnn_enabled
     self.is_reserved = is_reserved
     if not is_reserved:
       assert name not in self.ReservedNames
       # If reserved, we also allow other names...
     self.is_subnet = is_subnet
+    self.level = parent.level + 1 if parent else 0
     self.modules = []
     self.calls = []
+    self.tensor = None
+    self.returnn_ctx = None
     if call:
       self.assign_call(call)
-    if parent:
-      self.level = parent.level + 1
     if tensor:
       self.assign_tensor(tensor)
     if self.wrap_to_returnn_enabled:
@@ -85,15 +99,31 @@ class RegisteredName:
       res = f"<multiple calls {self.calls}>"
     return f"{mod} -> {res}"
 
-  def get_absolute_name(self):
-    names = []
-    name_ = self
-    while name_.parent:
-      names.insert(0, name_.name)
-      name_ = name_.parent
-    return "/".join(names) if names else ""
+  def get_absolute_name(self) -> str:
+    # parent and name are fixed after construction, so this can be cached.
+    if self._absolute_name is None:
+      if not self.parent:
+        self._absolute_name = ""
+      elif not self.parent.parent:
+        self._absolute_name = self.name
+      else:
+        self._absolute_name = f"{self.parent.get_absolute_name()}/{self.name}"
+    return self._absolute_name
+
+  @staticmethod
+  def invalidate_dump_caches():
+    """
+    Call this on any change which might affect
+    :func:`dump_as_returnn_layer_dict` or :func:`dump_as_returnn_net_dict`.
+    Layer dicts refer to the names of other layers in the parent namespace,
+    thus this conservatively invalidates the caches of all instances.
+    """
+    RegisteredName._dump_cache_version += 1
 
   def assign_tensor(self, tensor: _tensor.TensorEntry):
+    if self.tensor is tensor:
+      return
+    self.invalidate_dump_caches()
     if self.tensor:
       self.tensor.names.remove(self)
     self.tensor = tensor
@@ -102,6 +132,7 @@ class RegisteredName:
   def assign_call(self, call: _call.CallEntry):
     if call in self.calls:
       return
+    self.invalidate_dump_caches()
     self.assign_module(call.module)
     if self.is_subnet:
       assert call.module.module.has_torch_forward()
@@ -155,17 +186,20 @@ class RegisteredName:
 
   def _get_unique_name(self, suggested_name: str) -> str:
     if suggested_name not in self.childs_by_name and suggested_name not in self.ReservedNames:
-      return suggested_name
-    for i in itertools.count(1):
+      return sys.intern(suggested_name)
+    # Childs are never removed, so all suffixes below the counter are still taken.
+    for i in itertools.count(self._name_suffix_counter.get(suggested_name, 1)):
       suggested_name_ = f"{suggested_name}_{i}"
       if suggested_name_ not in self.childs_by_name and suggested_name_ not in self.ReservedNames:
-        return suggested_name_
+        self._name_suffix_counter[suggested_name] = i + 1
+        return sys.intern(suggested_name_)
 
   def register_sub_net(self, *, suggested_name: str) -> RegisteredName:
     assert self.is_subnetwork()
     name = self._get_unique_name(suggested_name)
     child = RegisteredName(parent=self, name=name, is_subnet=True)
     self.childs_by_name[name] = child
+    self.invalidate_dump_caches()
     return child
 
   def register_sub_call(self, call: _call.CallEntry) -> RegisteredName:
@@ -173,23 +207,36 @@ class RegisteredName:
     name = self._get_unique_name(call.module.get_canonical_name(parent_namespace=self))
     child = RegisteredName(parent=self, name=name, is_subnet=call.module.module.has_torch_forward())
     self.childs_by_name[name] = child
+    self.invalidate_dump_caches()
     child.assign_call(call)
     return child
 
   def register_input(self, tensor: _tensor.TensorEntry) -> RegisteredName:
+    return self.register_inputs([tensor])[0]
+
+  def register_inputs(self, tensors: List[_tensor.TensorEntry]) -> List[RegisteredName]:
     assert self.is_subnetwork()
-    name = self.ReservedInputName
-    assert tensor not in self._inputs
-    idx = len(self._inputs)
-    if idx != 0:
-      name += f":{idx}"  # should be consistent with RETURNN SubnetworkLayer concat_sources=False input naming logic
-    assert name not in self.childs_by_name
-    name_ = RegisteredName(parent=self, name=name, tensor=tensor, is_reserved=True, is_subnet=False)
-    self.childs_by_name[name] = name_
-    self._inputs.append(name_)
-    if self.wrap_to_returnn_enabled:
-      self.returnn_ctx.define_input(tensor, data_key=str(idx) if idx else None)
-    return name_
+    base_name = self.ReservedInputName
+    childs_by_name = self.childs_by_name
+    define_input = self.returnn_ctx.define_input if self.wrap_to_returnn_enabled else None
+    offset = len(self._inputs)
+    new_childs = {}
+    names = []
+    for i, tensor in enumerate(tensors):
+      assert tensor not in self._inputs
+      idx = offset + i
+      # should be consistent with RETURNN SubnetworkLayer concat_sources=False input naming logic
+      name = sys.intern(f"{base_name}:{idx}") if idx else base_name
+      assert name not in childs_by_name
+      name_ = RegisteredName(parent=self, name=name, tensor=tensor, is_reserved=True, is_subnet=False)
+      new_childs[name] = name_
+      names.append(name_)
+      if define_input:
+        define_input(tensor, data_key=str(idx) if idx else None)
+    childs_by_name.update(new_childs)
+    self._inputs.extend(names)
+    self.invalidate_dump_caches()
+    return names
 
   def register_returnn_subnet_output(self, tensor: _tensor.TensorEntry) -> RegisteredName:
     assert self.is_subnetwork()
@@ -197,14 +244,19 @@ class RegisteredName:
     naming = _naming.Naming.get_instance()
     assert naming.wrap_to_returnn_enabled
     name_ = self.name_for_tensor(tensor)
-    potential_calls = set(tensor.output_from_calls).intersection(set(self.childs_by_name[name_].calls))
-    assert len(potential_calls) == 1, f"{tensor.output_from_calls} vs {self.childs_by_name[name_].calls}"
-    call = list(potential_calls)[0]
+    child_calls = self.childs_by_name[name_].calls
+    # Both lists are usually very short, so a direct scan is cheaper than a set intersection.
+    potential_calls = [call for call in tensor.output_from_calls if call in child_calls]
+    assert len(potential_calls) == 1, f"{tensor.output_from_calls} vs {child_calls}"
+    call = potential_calls[0]
     self.assign_tensor(tensor)  # for this subnet
     name = self.ReservedOutputName
     assert name not in self.childs_by_name
     child = RegisteredName(parent=self, name=name, is_reserved=True, is_subnet=False)
     self.childs_by_name[name] = child
+    self.invalidate_dump_caches()
+    # Note: This needs a new module each time, as every module call maps to its own RETURNN layer
+    # (see CallEntry.apply_call), and modules are registered in the current Naming instance.
     copy_mod = Copy()
     copy_call = _call.CallEntry(module=naming.modules[copy_mod])
     copy_call.parent_call = call
@@ -247,12 +299,17 @@ class RegisteredName:
       print(f"{prefix}{name}: {child._repr_content()}")
       child.dump(prefix=f"{prefix}  ")
 
-  def dump_as_returnn_layer_dict(self):
+  def dump_as_returnn_layer_dict(self) -> Dict[str, Any]:
+    """
+    Note: The result is cached, so do not modify it.
+    """
     if self.calls and not self.calls[0].module.module.has_torch_forward():
       assert len(self.calls) == 1
       call = self.calls[0]
       return call.returnn_layer_dict
     # Subnetwork
+    if self._cached_layer_dict and self._cached_layer_dict[0] == self._dump_cache_version:
+      return self._cached_layer_dict[1]
     inputs = []
     for input_child in self._inputs:
       input_tensor = input_child.tensor
@@ -263,14 +320,23 @@ class RegisteredName:
       inputs.append(input_layer_name)
     subnet_dict = self.dump_as_returnn_net_dict()
     if len(inputs) <= 1:
-      return {"class": "subnetwork", "from": inputs[0] if inputs else [], "subnetwork": subnet_dict}
-    return {
-      "class": "subnetwork", "from": inputs, "subnetwork": subnet_dict, "concat_sources": False}
+      layer_dict = {"class": "subnetwork", "from": inputs[0] if inputs else [], "subnetwork": subnet_dict}
+    else:
+      layer_dict = {
+        "class": "subnetwork", "from": inputs, "subnetwork": subnet_dict, "concat_sources": False}
+    self._cached_layer_dict = (self._dump_cache_version, layer_dict)
+    return layer_dict
 
   def dump_as_returnn_net_dict(self) -> Dict[str, Dict[str, Any]]:
+    """
+    Note: The result is cached, so do not modify it.
+    """
+    if self._cached_net_dict and self._cached_net_dict[0] == self._dump_cache_version:
+      return self._cached_net_dict[1]
     net_dict = {}
     for name, child in self.childs_by_name.items():
       if not child.calls:
         continue  # e.g. input "data"
       net_dict[name] = child.dump_as_returnn_layer_dict()
+    self._cached_net_dict = (self._dump_cache_version, net_dict)
     return net_dict
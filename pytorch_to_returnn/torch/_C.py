@@ -86,17 +86,7 @@ class dtype:
     """
     Can be used for __eq__.
     """
-    d = {
-      "half": "float16",
-      "float": "float32",
-      "double": "float64",
-      "cfloat": "complex64",
-      "ddouble": "complex128",
-      "short": "int16",
-      "int": "int32",
-      "long": "int64",
-    }
-    return d.get(self.name, self.name)
+    return _dtype_canonical_names.get(self.name, self.name)
 
   @property
   def bit_size(self) -> int:
@@ -116,6 +106,18 @@ class dtype:
     raise TypeError(f"unexpected dtype {self.name}")
 
 
+_dtype_canonical_names = {
+  "half": "float16",
+  "float": "float32",
+  "double": "float64",
+  "cfloat": "complex64",
+  "ddouble": "complex128",
+  "short": "int16",
+  "int": "int32",
+  "long": "int64",
+}
+
+
 class Size(tuple):
   pass
 
@@ -4,9 +4,15 @@ This wraps both torch.nn.functional and torch.functional, and other __torch_func
 
 Note that this all maps to modules, which will be temporarily created.
 In RETURNN, every operation is a layer.
+
+The modules are intentionally created anew for every call, and must not be cached and reused:
+Every module is registered in the :class:`Naming` instance which is active at creation time,
+and calling the same module multiple times would require to share the params in RETURNN
+(see :func:`CallEntry.apply_call`).
 """
 
 import numpy
+from functools import lru_cache
 from typing import Optional, Union, List, Tuple, Dict, TypeVar, Sequence
 from . import modules
 from ..tensor import Tensor
@@ -19,9 +25,15 @@ _T = TypeVar("_T")
 
 
 def cast(input: Union[_T, Tensor, _number], dtype: Union[str, _dtype]) -> Union[_T, Tensor]:
-  dtype = _dtype(dtype)
-  if dtype == get_dtype(input):
-    return input
+  if isinstance(input, Tensor):
+    # Fast path, this is the common case.
+    if input.dtype is dtype or input.dtype == dtype:
+      return input
+    dtype = _as_dtype(dtype)
+  else:
+    dtype = _as_dtype(dtype)
+    if dtype == get_dtype(input):
+      return input
   return modules.Cast(dtype=dtype)(input)
 
 
@@ -29,23 +41,37 @@ def get_dtype(tensor: Union[Tensor, _number]) -> _dtype:
   if isinstance(tensor, Tensor):
     return tensor.dtype
   if isinstance(tensor, int):
-    return _dtype("int32")
+    return _dtype_from_name("int32")
   if isinstance(tensor, float):
-    return _dtype("float32")
+    return _dtype_from_name("float32")
   if isinstance(tensor, (numpy.number, numpy.ndarray)):
-    return _dtype(str(tensor.dtype))
+    return _dtype_from_name(str(tensor.dtype))
   raise TypeError(f"unexpected type {type(tensor)}")
 
 
 def result_type(tensor1: Union[Tensor, _number], tensor2: Union[Tensor, _number]) -> _dtype:
   # https://pytorch.org/docs/stable/generated/torch.result_type.html
-  return promote_types(get_dtype(tensor1), get_dtype(tensor2))
+  type1 = get_dtype(tensor1)
+  type2 = get_dtype(tensor2)
+  if type1 is type2:
+    return type1
+  return promote_types(type1, type2)
 
 
 def promote_types(type1: Union[str, _dtype], type2: Union[str, _dtype]) -> _dtype:
   # https://pytorch.org/docs/stable/generated/torch.promote_types.html
-  type1 = _dtype(type1)
-  type2 = _dtype(type2)
+  type1 = _as_dtype(type1)
+  type2 = _as_dtype(type2)
+  # Note: dtype.__hash__ is not consistent with dtype.__eq__ (e.g. "float" vs "float32"),
+  # thus we key by the canonical names.
+  key = (type1.canonical_name, type2.canonical_name)
+  res = _promote_types_table.get(key)
+  if res is None:
+    res = _promote_types_table[key] = _promote_types(_dtype_from_name(key[0]), _dtype_from_name(key[1]))
+  return res
+
+
+def _promote_types(type1: _dtype, type2: _dtype) -> _dtype:
   if type1.category_int != type2.category_int:
     if type1.category_int < type2.category_int:
       type1, type2 = type2, type1
@@ -61,6 +87,27 @@ def promote_types(type1: Union[str, _dtype], type2: Union[str, _dtype]) -> _dtyp
   return type1
 
 
+# (canonical name, canonical name) -> dtype.
+# Filled on first use, as some combinations are not supported (e.g. float16 with bfloat16).
+_promote_types_table = {}  # type: Dict[Tuple[str, str], _dtype]
+
+
+@lru_cache(maxsize=None)
+def _dtype_from_name(name: str) -> _dtype:
+  """
+  dtype instances are never modified, so we can share them.
+  """
+  return _dtype(name)
+
+
+def _as_dtype(dtype: Union[str, _dtype]) -> _dtype:
+  if isinstance(dtype, _dtype):
+    return dtype
+  if isinstance(dtype, str):
+    return _dtype_from_name(dtype)
+  return _dtype(dtype)  # will raise TypeError
+
+
 def as_tensor(data: Union[Tensor, _number],
               dtype: Optional[Union[str, _dtype]] = None,
               device=None) -> Tensor:
@@ -74,23 +121,26 @@ def as_tensor(data: Union[Tensor, _number],
 
 
 def add(x: Tensor, y: Tensor) -> Tensor:
-  dtype = result_type(x, y)
-  return modules.BinaryOperator(kind="add")(cast(x, dtype), cast(y, dtype))
+  return _binary_operator("add", x, y)
 
 
 def sub(x: Tensor, y: Tensor) -> Tensor:
-  dtype = result_type(x, y)
-  return modules.BinaryOperator(kind="sub")(cast(x, dtype), cast(y, dtype))
+  return _binary_operator("sub", x, y)
 
 
 def mul(x: Tensor, y: Tensor) -> Tensor:
-  dtype = result_type(x, y)
-  return modules.BinaryOperator(kind="mul")(cast(x, dtype), cast(y, dtype))
+  return _binary_operator("mul", x, y)
 
 
 def truediv(x: Tensor, y: Tensor) -> Tensor:
-  dtype = result_type(x, y)
-  return modules.BinaryOperator(kind="truediv")(cast(x, dtype), cast(y, dtype))
+  return _binary_operator("truediv", x, y)
+
+
+def _binary_operator(kind: str, x: Union[Tensor, _number], y: Union[Tensor, _number]) -> Tensor:
+  if not (isinstance(x, Tensor) and isinstance(y, Tensor) and (x.dtype is y.dtype or x.dtype == y.dtype)):
+    dtype = result_type(x, y)
+    x, y = cast(x, dtype), cast(y, dtype)
+  return modules.BinaryOperator(kind=kind)(x, y)
 
 
 def flatten(input: Tensor, start_dim=0, end_dim=-1) -> Tensor:
@@ -107,50 +157,64 @@ def reshape(input: Tensor, shape: Tuple[int, ...]) -> Tensor:
       num //= dim
     shape = [dim if dim >= 0 else num for dim in shape]
 
+  in_shape = input.shape  # Tensor.shape creates a new object on every access, thus keep it here
+  if in_shape == tuple(shape):
+    return input  # nothing to do, do not create any layer
+
   # Use Flatten, Unflatten, Squeeze.
   # (Other reshapes are disallowed.)
+  # The common view-style reshapes (a single merge or a single split of axes) already result in
+  # a single Flatten (merge_dims) or Unflatten (split_dims) layer, which also take care of the batch/time dims.
+  # Thus we do not fuse them into a custom reshape layer.
   axis1, axis2 = 0, 0
-  while axis1 < len(input.shape) and axis2 < len(shape):
-    if input.shape[axis1] == shape[axis2]:
+  while axis1 < len(in_shape) and axis2 < len(shape):
+    in_dim, out_dim = in_shape[axis1], shape[axis2]
+    if in_dim == out_dim:
       axis1 += 1
       axis2 += 1
       continue
-    elif input.shape[axis1] < shape[axis2]:
-      if input.shape[axis1] == 1:
+    elif in_dim < out_dim:
+      if in_dim == 1:
         input = modules.Squeeze(dim=axis1).as_returnn_torch_functional()(input)
+        in_shape = input.shape
         continue
-      n = 1
-      a = axis1
-      while a < len(input.shape) and n < shape[axis2]:
-        assert shape[axis2] % n == 0 and n < shape[axis2]
-        n *= input.shape[a]
+      # Merge the input axes axis1..a-1 into out_dim.
+      n = in_dim
+      a = axis1 + 1
+      while a < len(in_shape) and n < out_dim:
+        n *= in_shape[a]
         a += 1
-      assert n == shape[axis2]
+      assert n == out_dim
       input = modules.Flatten(start_dim=axis1, end_dim=a - 1).as_returnn_torch_functional()(input)
-      assert input.shape[axis1] == shape[axis2]
+      in_shape = input.shape
+      assert in_shape[axis1] == out_dim
+      axis1 += 1
+      axis2 += 1
       continue
-    elif input.shape[axis1] > shape[axis2]:
-      n = 1
-      a = axis2
-      while a < len(shape) and n < input.shape[axis1]:
-        assert input.shape[axis1] % n == 0 and n < input.shape[axis1]
+    else:  # in_dim > out_dim
+      # Split in_dim into the output axes axis2..a-1.
+      n = out_dim
+      a = axis2 + 1
+      while a < len(shape) and n < in_dim:
         n *= shape[a]
         a += 1
-      assert n == input.shape[axis1]
+      assert n == in_dim
       input = modules.Unflatten(dim=axis1, unflattened_size=tuple(shape[axis2:a])).as_returnn_torch_functional()(input)
-      assert input.shape[axis1] == shape[axis2]
+      in_shape = input.shape
+      assert in_shape[axis1:axis1 + a - axis2] == tuple(shape[axis2:a])
+      axis1 += a - axis2
+      axis2 = a
       continue
-    else:
-      assert False  # cannot happen
   assert axis1 == axis2
-  if len(input.shape) < len(shape):
-    assert all(shape[i] == 1 for i in range(len(input.shape), len(shape)))
+  if len(in_shape) < len(shape):
+    assert all(shape[i] == 1 for i in range(len(in_shape), len(shape)))
     input = modules.Unflatten(
-      dim=-1, unflattened_size=shape[len(input.shape) - 1:]).as_returnn_torch_functional()(input)
-  elif len(input.shape) > len(shape):
-    while len(input.shape) > len(shape):
+      dim=-1, unflattened_size=shape[len(in_shape) - 1:]).as_returnn_torch_functional()(input)
+  elif len(in_shape) > len(shape):
+    for _ in range(len(in_shape) - len(shape)):
       input = modules.Squeeze(dim=len(shape)).as_returnn_torch_functional()(input)
-  assert len(input.shape) == len(shape) and input.shape == tuple(shape)
+  in_shape = input.shape
+  assert len(in_shape) == len(shape) and in_shape == tuple(shape)
   return input
 
 
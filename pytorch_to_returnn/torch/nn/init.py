@@ -1,4 +1,13 @@
 
+"""
+Param init functions.
+The init functions (``*_``, e.g. :func:`kaiming_uniform_`) are all no-ops,
+as the param values are always imported from the original Torch module,
+thus there is also no random number generation which could be batched or deferred.
+"""
+
+from functools import lru_cache
+from typing import Tuple
 from ..tensor import Tensor
 
 
@@ -6,12 +15,18 @@ def _calculate_fan_in_and_fan_out(tensor: Tensor):
   dimensions = tensor.dim()
   if dimensions < 2:
     raise ValueError("Fan in and fan out can not be computed for tensor with fewer than 2 dimensions")
+  return _calculate_fan_in_and_fan_out_for_shape(tuple(tensor.shape))
 
-  num_input_fmaps = tensor.size(1)
-  num_output_fmaps = tensor.size(0)
+
+@lru_cache(maxsize=256)
+def _calculate_fan_in_and_fan_out_for_shape(shape: Tuple[int, ...]) -> Tuple[int, int]:
+  # Only depends on the shape, and many params share the same shape.
+  # Also, unlike the original tensor[0][0].numel(), this does not create Gather calls.
+  num_input_fmaps = shape[1]
+  num_output_fmaps = shape[0]
   receptive_field_size = 1
-  if tensor.dim() > 2:
-    receptive_field_size = tensor[0][0].numel()
+  for dim in shape[2:]:
+    receptive_field_size *= dim
   fan_in = num_input_fmaps * receptive_field_size
   fan_out = num_output_fmaps * receptive_field_size
 
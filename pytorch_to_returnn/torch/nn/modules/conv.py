@@ -2,7 +2,8 @@
 from __future__ import annotations
 import tensorflow as tf
 import math
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
 from returnn.tf.layers.basic import LayerBase, ConvLayer
 from .module import Module
 from .utils import _single, _pair, _triple, _reverse_repeat_tuple, _ntuple
@@ -12,7 +13,25 @@ from ..parameter import Parameter
 from .. import init
 
 
+_KAIMING_A = math.sqrt(5.)  # as used by reset_parameters in the original Torch code
+_VALID_PADDING_MODES = frozenset({'zeros', 'reflect', 'replicate', 'circular'})
+
+
+def _get_reversed_padding_repeated_twice(padding):
+  # Usually the same few paddings are used by all the convs, thus share the resulting tuples.
+  if isinstance(padding, tuple):
+    return _reverse_repeat_tuple_twice_cached(padding)
+  return _reverse_repeat_tuple(padding, 2)
+
+
+@lru_cache(maxsize=None)
+def _reverse_repeat_tuple_twice_cached(padding: Tuple[int, ...]) -> Tuple[int, ...]:
+  return _reverse_repeat_tuple(padding, 2)
+
+
 class _ConvNd(Module):
+  # No __slots__ here: Module relies on the instance __dict__ (see Module.__setattr__),
+  # weight/bias live in _parameters, and transposed is a class-level default.
   nd: Optional[int] = None  # defined by subclass
   transposed: bool = False
 
@@ -29,30 +48,31 @@ class _ConvNd(Module):
                bias: bool = True,
                padding_mode: str = "zeros") -> None:
     super(_ConvNd, self).__init__()
-    if in_channels % groups != 0:
-      raise ValueError('in_channels must be divisible by groups')
-    if out_channels % groups != 0:
-      raise ValueError('out_channels must be divisible by groups')
-    valid_padding_modes = {'zeros', 'reflect', 'replicate', 'circular'}
-    if padding_mode not in valid_padding_modes:
+    if groups != 1:  # usually it is 1, and then there is nothing to check
+      if in_channels % groups != 0:
+        raise ValueError('in_channels must be divisible by groups')
+      if out_channels % groups != 0:
+        raise ValueError('out_channels must be divisible by groups')
+    if padding_mode not in _VALID_PADDING_MODES:
       raise ValueError("padding_mode must be one of {}, but got padding_mode='{}'".format(
-        valid_padding_modes, padding_mode))
+        set(_VALID_PADDING_MODES), padding_mode))
+    to_tuple = _ntuple(self.nd)
     self.in_channels = in_channels
     self.out_channels = out_channels
-    self.kernel_size = _ntuple(self.nd)(kernel_size)
-    self.stride = _ntuple(self.nd)(stride)
-    self.padding = _ntuple(self.nd)(padding)
-    self.dilation = _ntuple(self.nd)(dilation)
+    self.kernel_size = to_tuple(kernel_size)
+    self.stride = to_tuple(stride)
+    self.padding = to_tuple(padding)
+    self.dilation = to_tuple(dilation)
     if transposed is not None:
       self.transposed = transposed
-    self.output_padding = _ntuple(self.nd)(output_padding)
+    self.output_padding = to_tuple(output_padding)
     self.groups = groups
     self.padding_mode = padding_mode
     # `_reversed_padding_repeated_twice` is the padding to be passed to
     # `F.pad` if needed (e.g., for non-zero padding types that are
     # implemented as two ops: padding + conv). `F.pad` accepts paddings in
     # reverse order than the dimension.
-    self._reversed_padding_repeated_twice = _reverse_repeat_tuple(self.padding, 2)
+    self._reversed_padding_repeated_twice = _get_reversed_padding_repeated_twice(self.padding)
     if self.transposed:
       self.weight = Parameter(Tensor(
         in_channels, out_channels // groups, *self.kernel_size))
@@ -66,13 +86,18 @@ class _ConvNd(Module):
     self.reset_parameters()
 
   def reset_parameters(self) -> None:
-    init.kaiming_uniform_(self.weight, a=math.sqrt(5))
+    # The init functions do not touch the buffers (see init.py),
+    # as the real values get imported from the original Torch module anyway (import_params_torch_to_returnn).
+    # Thus we do not need any lazy initialization of the params here.
+    init.kaiming_uniform_(self.weight, a=_KAIMING_A)
     if self.bias is not None:
       fan_in, _ = init._calculate_fan_in_and_fan_out(self.weight)
-      bound = 1 / math.sqrt(fan_in)
+      bound = fan_in ** -0.5
       init.uniform_(self.bias, -bound, bound)
 
   def create_returnn_layer_dict(self, input: Tensor) -> Dict[str, Any]:
+    # This is called only once per module instance (module reuse is not supported, see CallEntry.apply_call),
+    # thus a precomputed per-instance layer dict template would not save anything.
     assert len(input.shape) == 2 + self.nd
     self._assert_spatial_axes_in_order(input)  # not implemented otherwise
     assert self.groups == 1  # not implemented otherwise
@@ -251,21 +276,21 @@ class _FunctionalConvNd(Module):
                groups: int = 1,
                padding_mode: str = "zeros") -> None:
     super(_FunctionalConvNd, self).__init__()
-    valid_padding_modes = {'zeros', 'reflect', 'replicate', 'circular'}
-    if padding_mode not in valid_padding_modes:
+    if padding_mode not in _VALID_PADDING_MODES:
       raise ValueError("padding_mode must be one of {}, but got padding_mode='{}'".format(
-        valid_padding_modes, padding_mode))
-    self.stride = _ntuple(self.nd)(stride)
-    self.padding = _ntuple(self.nd)(padding)
-    self.dilation = _ntuple(self.nd)(dilation)
-    self.output_padding = _ntuple(self.nd)(output_padding)
+        set(_VALID_PADDING_MODES), padding_mode))
+    to_tuple = _ntuple(self.nd)
+    self.stride = to_tuple(stride)
+    self.padding = to_tuple(padding)
+    self.dilation = to_tuple(dilation)
+    self.output_padding = to_tuple(output_padding)
     self.groups = groups
     self.padding_mode = padding_mode
     # `_reversed_padding_repeated_twice` is the padding to be passed to
     # `F.pad` if needed (e.g., for non-zero padding types that are
     # implemented as two ops: padding + conv). `F.pad` accepts paddings in
     # reverse order than the dimension.
-    self._reversed_padding_repeated_twice = _reverse_repeat_tuple(self.padding, 2)
+    self._reversed_padding_repeated_twice = _get_reversed_padding_repeated_twice(self.padding)
 
   def create_returnn_layer_dict(self, input: Tensor, weight: Tensor, bias: Optional[Tensor] = None) -> Dict[str, Any]:
     assert len(input.shape) == 2 + self.nd
@@ -329,6 +354,7 @@ class FunctionalConvTransposed1d(_FunctionalConvNd):
 
 
 __all__ = [
-  key for (key, value) in sorted(globals().items())
-  if not key.startswith("_")
-  and getattr(value, "__module__", "") == __name__]
+  "Conv1d", "Conv2d",
+  "ConvTranspose1d", "ConvTranspose2d",
+  "FunctionalConv1d", "FunctionalConv2d", "FunctionalConvTransposed1d",
+]
@@ -1,17 +1,26 @@
 
 import collections.abc
+from functools import lru_cache
 from itertools import repeat
 from typing import List, Union
 
 
 def _ntuple(n):
     def parse(x):
+        if isinstance(x, (int, float)):
+            return _repeat_scalar(x, n)
         if isinstance(x, collections.abc.Iterable):
             return x
         return tuple(repeat(x, n))
     return parse
 
 
+@lru_cache(maxsize=256, typed=True)  # typed, such that e.g. 1 and 1.0 are distinct
+def _repeat_scalar(x: Union[int, float], n: int):
+    # Tuples are immutable, thus it is safe to share them.
+    return tuple(repeat(x, n))
+
+
 _single = _ntuple(1)
 _pair = _ntuple(2)
 _triple = _ntuple(3)
@@ -69,6 +69,90 @@ def test_base_get_output_shape_from_returnn_2d_reorder_dynamic():
     assert torch_shape == (64, 1, 11, 13)
 
 
+def test_promote_types():
+  from pytorch_to_returnn.torch.nn.functional import promote_types
+  assert promote_types("float32", "int64") == "float32"
+  assert promote_types("int32", "int64") == "int64"
+  assert promote_types("bool", "int32") == "int32"
+  assert promote_types("float", "float32") == "float32"
+  assert promote_types(torch.dtype("float64"), "float32") == "float64"
+  # Second time via the table.
+  assert promote_types("int64", "float32") == "float32"
+
+
+def test_pack_inputs_as():
+  from tensorflow.python.util import nest
+  from pytorch_to_returnn.naming.call import _pack_inputs_as
+  with Naming.make_instance() as naming:
+    tensors = [torch.Tensor(2, 3) for _ in range(3)]
+    a, b, c = [naming.register_tensor(x) for x in tensors]
+    for args, kwargs in [
+          ((a, None), {"z": b, "a": c, "m": None}),  # unsorted kwargs keys, None leaves
+          ((), {"y": a, "x": b}),  # no args
+          ((a, b), {}),
+          (([a, b], None), {"k": c}),  # nested, uses the nest fallback
+        ]:
+      structure = (args, kwargs)
+      # Some dummy flat values, to see where they end up.
+      inputs_flat = [f"flat{i}" for i in range(len(nest.flatten(structure)))]
+      res = _pack_inputs_as(inputs_args=args, inputs_kwargs=kwargs, inputs_flat=inputs_flat)
+      expected_args, expected_kwargs = nest.pack_sequence_as(structure=structure, flat_sequence=inputs_flat)
+      assert res[0] == tuple(expected_args)
+      assert res[1] == expected_kwargs
+      assert list(res[1].keys()) == list(kwargs.keys())
+
+
+def test_namespace_dump_cache():
+  import tensorflow as tf
+  with tf.Graph().as_default():
+    with Naming.make_instance() as naming:
+      assert isinstance(naming, Naming)
+      x = torch.from_numpy(numpy.zeros((3, 5, 7), dtype="float32"))
+      naming.register_input(x, Data("data", shape=(None, 7)))
+      y = torch.nn.ReLU()(x)
+      root = naming.root_namespace
+      net_dict = root.dump_as_returnn_net_dict()
+      assert root.dump_as_returnn_net_dict() is net_dict  # cached
+      # Another call must invalidate the cache.
+      z = torch.nn.Tanh()(y)
+      net_dict2 = root.dump_as_returnn_net_dict()
+      assert net_dict2 is not net_dict
+      new_names = set(net_dict2).difference(net_dict)
+      assert len(new_names) == 1
+      new_name, = new_names
+      assert net_dict2[new_name]["activation"] == "tanh"
+      assert root.dump_as_returnn_net_dict() is net_dict2
+      # Registering the output adds the "output" layer.
+      naming.register_output(z)
+      net_dict3 = root.dump_as_returnn_net_dict()
+      assert net_dict3 is not net_dict2
+      assert "output" in net_dict3 and "output" not in net_dict2
+
+
+def test_ntuple_shared():
+  from pytorch_to_returnn.torch.nn.modules.utils import _single, _pair
+  assert _single(3) == (3,) and _single(3) is _single(3)
+  assert _pair(1) == (1, 1) and _pair(1) is _pair(1)
+  assert type(_single(1.)[0]) is float and type(_single(1)[0]) is int
+  assert _pair((2, 3)) == (2, 3)
+
+
+def test_calculate_fan_in_and_fan_out():
+  from pytorch_to_returnn.torch.nn import init
+  with Naming.make_instance():
+    assert init._calculate_fan_in_and_fan_out(torch.Tensor(8, 4, 3, 5)) == (60, 120)
+    assert init._calculate_fan_in_and_fan_out(torch.Tensor(7, 3)) == (3, 7)
+
+
+def test_conv_all():
+  from pytorch_to_returnn.torch.nn.modules import conv
+  # The static __all__ must cover all public classes defined there.
+  assert conv.__all__ == [
+    key for (key, value) in sorted(vars(conv).items())
+    if not key.startswith("_")
+    and getattr(value, "__module__", "") == conv.__name__]
+
+
 if __name__ == "__main__":
   if len(sys.argv) <= 1:
     for k, v in sorted(globals().items()):